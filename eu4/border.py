@@ -4,9 +4,8 @@ Functions for rendering borders from the colored regions of an image. Primarily
 rendering province borders from province maps.
 '''
 
+import numpy as np
 import PIL.Image as img
-import PIL.ImageChops as chops
-import PIL.ImageDraw as draw
 
 from eu4 import image
 
@@ -20,9 +19,10 @@ def renderBorders(provinces: image.RGB) -> image.Grayscale:
     :param provinces: The image to render borders using
     :return: The border image. A pixel is black if it's a border pixel and white otherwise
     '''
-    shiftDown = _shiftDifference(provinces, 0, 1)
-    shiftRight = _shiftDifference(provinces, 1, 0)
-    shiftDownRight = _shiftDifference(provinces, 1, 1)
+    pixels = _packColors(provinces.array)
+    shiftDown = _shiftDifference(pixels, 0, 1)
+    shiftRight = _shiftDifference(pixels, 1, 0)
+    shiftDownRight = _shiftDifference(pixels, 1, 1)
     differences = [shiftDown, shiftRight, shiftDownRight]
     return _differencesToBorders(differences)
 
@@ -37,65 +37,67 @@ def renderDoubleBorders(provinces: image.RGB, thick: bool = False) -> image.Gray
     :param thick: Whether the borders should be doubled in width
     :return: The border image. A pixel is black if it's a border pixel and white otherwise
     '''
-    shiftDown = _shiftDifference(provinces, 0, 1)
-    shiftRight = _shiftDifference(provinces, 1, 0)
-    shiftUp = _shiftDifference(provinces, 0, -1)
-    shiftLeft = _shiftDifference(provinces, -1, 0)
+    pixels = _packColors(provinces.array)
+    shiftDown = _shiftDifference(pixels, 0, 1)
+    shiftRight = _shiftDifference(pixels, 1, 0)
+    shiftUp = _shiftDifference(pixels, 0, -1)
+    shiftLeft = _shiftDifference(pixels, -1, 0)
     differences = [shiftDown, shiftRight, shiftUp, shiftLeft]
     if thick:
-        shiftDownRight = _shiftDifference(provinces, 1, 1)
-        shiftDownLeft = _shiftDifference(provinces, -1, 1)
-        shiftUpRight = _shiftDifference(provinces, 1, -1)
-        shiftUpLeft = _shiftDifference(provinces, -1, -1)
+        shiftDownRight = _shiftDifference(pixels, 1, 1)
+        shiftDownLeft = _shiftDifference(pixels, -1, 1)
+        shiftUpRight = _shiftDifference(pixels, 1, -1)
+        shiftUpLeft = _shiftDifference(pixels, -1, -1)
         differences += [shiftDownRight, shiftDownLeft, shiftUpRight, shiftUpLeft]
     return _differencesToBorders(differences)
 
 
-def _differencesToBorders(images: list[img.Image]) -> image.Grayscale:
+def _differencesToBorders(differences: list[np.ndarray]) -> image.Grayscale:
     '''
-    Merge multiple pixel difference images into a single grayscale border image. This is done by
-    merging all bands of the input images together, then inverting the result. Thus, black
-    pixels in the resulting image mean that the pixel was non-black in at least one
-    of the input images.
+    Merge multiple pixel difference arrays into a single grayscale border image. A pixel is a
+    border pixel (black) if it changed in at least one of the input arrays, and white otherwise.
 
-    :param images: The pixel difference images to merge
+    :param differences: The boolean pixel difference arrays to merge
     :return: The border image
     '''
-    result = img.new("L", images[0].size)
-    for im in images:
-        for band in im.split():
-            result = chops.add(result, band)
-    # merge all image bands into one grayscale image
-    # the only non-black pixels in the result are the borders
-    borders = image.Grayscale(result)
-    # set black to white and non-black to black
-    return borders.flattened().inverted()
-
-
-def _shiftDifference(provinces: image.RGB, shiftX: int, shiftY: int) -> img.Image:
+    changed = np.logical_or.reduce(differences)
+    # set unchanged pixels to white and changed pixels to black
+    return image.Grayscale(img.fromarray(np.where(changed, 0, 255).astype(np.uint8)))
+
+
+def _packColors(pixels: np.ndarray) -> np.ndarray:
+    '''
+    Packs the color channels of every pixel into a single integer, so pixels can be compared with one
+    comparison instead of one per channel. The channels are shifted in place into a single buffer to
+    avoid creating temporary arrays.
+
+    :param pixels: The image's pixels, as a (height, width, 3) array
+    :return: The packed colors, as a (height, width) array
+    '''
+    packed = pixels[..., 0].astype(np.uint32)
+    packed <<= 8
+    packed |= pixels[..., 1]
+    packed <<= 8
+    packed |= pixels[..., 2]
+    return packed
+
+
+def _shiftDifference(pixels: np.ndarray, shiftX: int, shiftY: int) -> np.ndarray:
     '''
-    Returns the pixel difference between an image and a copy of itself shifted down-rightwards
-    by the given amount. If a pixel is non-black in the difference image, it means its color
-    changed between the original and the shifted image.
+    Compares an image with a copy of itself shifted down-rightwards by the given amount. Returns
+    a boolean array that is true wherever a pixel's color changed between the original and the
+    shifted image.
 
-    :param provinces: The image to compare
+    :param pixels: The image to compare, as a (height, width) array of colors packed with `_packColors`
     :param shiftX: The horizontal shift amount (positive is right)
     :param shiftY: The vertical shift amount (positive is down)
     '''
-    image = provinces.bitmap
-    shifted = image.transform(
-        image.size, 
-        img.Transform.AFFINE, 
-        (1, 0, -shiftX, 0, 1, -shiftY))
-    diff = chops.difference(image, shifted)
-    # set pixels outside the shifted image's range to black
-    drawing = draw.Draw(diff)
-    if shiftX > 0:
-        drawing.rectangle((0, 0, shiftX - 1, diff.height), fill=0)
-    if shiftY > 0:
-        drawing.rectangle((0, 0, diff.width, shiftY - 1), fill=0)
-    if shiftX < 0:
-        drawing.rectangle((diff.width + shiftX, 0, diff.width, diff.height), fill=0)
-    if shiftY < 0:
-        drawing.rectangle((0, diff.height + shiftY, diff.width, diff.height), fill=0)
-    return diff
+    height, width = pixels.shape
+    # compare each pixel with the one (shiftX, shiftY) pixels up-left of it, using slice views
+    #  of the same array instead of a transformed copy
+    # pixels outside the shifted image's range count as unchanged
+    target = (slice(max(shiftY, 0), height + min(shiftY, 0)), slice(max(shiftX, 0), width + min(shiftX, 0)))
+    source = (slice(max(-shiftY, 0), height + min(-shiftY, 0)), slice(max(-shiftX, 0), width + min(-shiftX, 0)))
+    changed = np.zeros((height, width), dtype=bool)
+    changed[target] = pixels[target] != pixels[source]
+    return changed
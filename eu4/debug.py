@@ -1,3 +1,4 @@
+import concurrent.futures
 import random
 import re
 import os
@@ -28,14 +29,22 @@ def generatePresets(outputDir: str = "test", modloader: bool = False, mod: str |
     defaultMap = mapfiles.DefaultMap(eu4)
     definition = mapfiles.ProvinceDefinition(eu4, defaultMap)
     climate = mapfiles.Climate(eu4, defaultMap)
-    heightmap = mapfiles.Heightmap(eu4, defaultMap)
-    terrain = mapfiles.TerrainMap(eu4, defaultMap)
     terrainDefinition = mapfiles.TerrainDefinition(eu4, defaultMap)
-    tree = mapfiles.TreeMap(eu4, defaultMap)
-    river = mapfiles.RiverMap(eu4, defaultMap)
 
+    # The bitmaps don't depend on each other, so decode them in parallel
+    # Script files are still parsed sequentially above
     print("Loading map...")
-    provinceMap = mapfiles.ProvinceMap(eu4, defaultMap, definition)
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        heightmapFuture = executor.submit(mapfiles.Heightmap, eu4, defaultMap)
+        terrainFuture = executor.submit(mapfiles.TerrainMap, eu4, defaultMap)
+        treeFuture = executor.submit(mapfiles.TreeMap, eu4, defaultMap)
+        riverFuture = executor.submit(mapfiles.RiverMap, eu4, defaultMap)
+        provinceMapFuture = executor.submit(mapfiles.ProvinceMap, eu4, defaultMap, definition)
+    heightmap = heightmapFuture.result()
+    terrain = terrainFuture.result()
+    tree = treeFuture.result()
+    river = riverFuture.result()
+    provinceMap = provinceMapFuture.result()
 
     presets.blank(defaultMap, provinceMap, definition, climate).save(f"{outputDir}/output.png")
     presets.landProvinces(defaultMap, provinceMap, definition, climate).save(f"{outputDir}/output1.png")
@@ -115,7 +124,7 @@ def generateTerrainTest(modloader: bool = False, mod: str | int | list[str | int
     print("Overlaying trees...")
     # overlay the tree map on the terrain map (ignoring black (palette index 0) pixels)
     terrainImage = terrain.bitmap.convert("RGB")
-    terrainImage.paste(tree.resizedBitmap.convert("RGB"), mask=tree.resizedBitmap.point(lambda p: 1 if p else 0, mode="1"))
+    terrainImage.paste(tree.resizedBitmap.convert("RGB"), mask=tree.resizedBitmap.point(bytes([0] + [1] * 255), mode="1"))
 
     print("Generating pixels...")
     # generate a pixel of color for each chosen province
@@ -235,14 +244,16 @@ def testTerrainAssignments():
 
     print("Recoloring provinces...")
     recolorTerrain = recolor.Recolor(provinceMap, provinceDef)
+    landProvinces = [province for province in provinceMap.provinces
+                     if province not in defaultMap.seas + defaultMap.lakes and province not in climate.wastelands]
+    terrains = terrainDef.getTerrains(landProvinces, defaultMap, terrainMap, provinceMap, treeMap, riverMap)
     for province in provinceMap.provinces:
         if province in defaultMap.seas + defaultMap.lakes:
             recolorTerrain[province] = (68, 107, 163)
         elif province in climate.wastelands:
             recolorTerrain[province] = (94, 94, 94)
         else:
-            terrain = terrainDef.getTerrain(province, defaultMap, terrainMap, provinceMap, treeMap, riverMap)
-            recolorTerrain[province] = terrain.color
+            recolorTerrain[province] = terrains[province].color
     generatedTerrainMap = recolorTerrain.generate().bitmap
 
     print("Getting screenshot...")
@@ -290,7 +301,7 @@ def testTerrainAssignments():
     for _, provinceColor in colorCount:
         if provinceColor == (0, 0, 0):
             continue
-        provinceID = provinceDef.province.get(provinceColor)
+        provinceID = provinceDef.province.get(mapfiles.packColor(provinceColor))
         if provinceID is None:
             continue
         if provinceID in defaultMap.seas + defaultMap.lakes:
@@ -11,13 +11,26 @@ implemented, a Scope may have multiple items with the same key, and the order of
 import ClauseWizard as cw
 import csv
 import enum
+import hashlib
 import json
+import os
+import pickle
 
-from typing import Any
+from typing import Any, Callable, Self
 
 type Item = Value | list[Value] | Scope
 type Value = str | int | float | bool
 
+# Where `cached` stores its files. This is the "eu4map" directory inside the user's cache directory, which
+#  is %LOCALAPPDATA% on Windows and $XDG_CACHE_HOME (or ~/.cache if unset) elsewhere, so the same cache is
+#  used no matter which directory the package is run from
+CACHE_DIRECTORY = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "eu4map")
+# Part of the key of every cached value. Bump this whenever the format of a cached value, or how it's built,
+#  changes, so that values cached by older versions aren't loaded
+CACHE_VERSION = 1
+
 
 # An ordered list of key-item pairs where keys do not have to be unique
 class Scope:
@@ -29,10 +42,11 @@ class Scope:
     '''
 
     scope: list[tuple[str, Item]]
-    '''The list of key-item pairs in this scope'''
+    '''The list of key-item pairs in this scope. Pairs should only be added through `Scope.append`'''
 
     def __init__(self):
         self.scope = []
+        self._index: dict[str, list[Item]] | None = None
     
     def __iter__(self):
         return iter(self.scope)
@@ -45,7 +59,13 @@ class Scope:
         :param key: The key to search for
         :return: A list of all items with the given key
         '''
-        return [v for k, v in self if k == key]
+        # the items of every key are gathered in a single pass the first time anything is looked up, instead
+        #  of searching the whole scope on every lookup
+        if self._index is None:
+            self._index = {}
+            for k, v in self:
+                self._index.setdefault(k, []).append(v)
+        return list(self._index.get(key, ()))
     
     def _get(self, key: str) -> Any | None:
         '''
@@ -114,6 +134,7 @@ class Scope:
         :param item: The item of the pair, or an empty string if it's missing
         '''
         self.scope.append((key, item))
+        self._index = None
 
 class ScopeFile:
     '''
@@ -231,3 +252,88 @@ class NoneEnum(enum.Enum):
     @classmethod
     def _missing_(cls, _) -> Any:
         return cls(None)
+
+    @classmethod
+    def parse(cls, value: Any) -> Self:
+        '''
+        Converts a value to the enum in the same way as calling the enum, but with a single dictionary
+        lookup instead of going through the enum's call machinery. Useful when converting many values,
+        such as every row of a file.
+
+        :param value: The value to convert
+        :return: The enum member with the given value, or the None member if there is none
+        '''
+        member = cls._value2member_map_.get(value)
+        if member is None:
+            return cls(None)
+        return member # type: ignore
+
+
+def cached(name: str, paths: list[str], build: Callable[[], Any]) -> Any:
+    '''
+    Returns a value derived from the given files, loading it from the disk cache in `CACHE_DIRECTORY` if
+    possible. Otherwise, the value is built and then cached. A cached value is tied to the exact files it
+    was built from, so it's rebuilt if any of them are changed or moved, or if `CACHE_VERSION` is changed.
+    Only the latest value of each name and set of files is kept, older ones are deleted when it's cached. The
+    cache is best-effort: a cached value that can't be loaded is rebuilt, and a value that can't be cached is
+    still returned.
+
+    :param name: The name of the value, which should also include anything else the value depends on
+    :param paths: The paths to the files the value is derived from
+    :param build: A function that builds the value
+    :return: The value
+    '''
+    absolutePaths = [os.path.abspath(path) for path in paths]
+    stats = []
+    for path in absolutePaths:
+        stat = os.stat(path)
+        stats.append((stat.st_mtime_ns, stat.st_size))
+    # the paths are kept separate from the rest of the key, so that values built from other files (such as
+    #  another mod's) are left alone when pruning
+    prefix = f"{name}-{hashlib.sha1(repr(absolutePaths).encode()).hexdigest()}-"
+    key = hashlib.sha1(repr((CACHE_VERSION, stats)).encode()).hexdigest()
+    cacheFilename = f"{prefix}{key}.pickle"
+    cachePath = os.path.join(CACHE_DIRECTORY, cacheFilename)
+    try:
+        with open(cachePath, "rb") as file:
+            return pickle.load(file)
+    except Exception:
+        pass # not cached yet, or the cache file is broken or was written with incompatible library versions
+    value = build()
+
+    # the cache is only there to speed things up, so the value is still returned if it can't be written
+    temporaryPath = f"{cachePath}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        # write to a temporary file first so a cache file is never seen half-written
+        with open(temporaryPath, "wb") as file:
+            pickle.dump(value, file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaryPath, cachePath)
+
+        # the older values of this name and files were built from older versions of the files, so they're
+        #  removed instead of piling up
+        for filename in os.listdir(CACHE_DIRECTORY):
+            if filename == cacheFilename or not _isCacheFilename(filename, prefix):
+                continue
+            try:
+                os.remove(os.path.join(CACHE_DIRECTORY, filename))
+            except OSError:
+                pass # already removed, or still in use on Windows
+    except OSError:
+        try:
+            os.remove(temporaryPath)
+        except OSError:
+            pass # never created
+    return value
+
+def _isCacheFilename(filename: str, prefix: str) -> bool:
+    '''
+    Checks whether a file in `CACHE_DIRECTORY` is a cached value with the given prefix, which identifies the
+    value's name and the files it was built from. Names that only share a prefix with it don't count.
+
+    :param filename: The name of the file
+    :param prefix: The prefix of the value's filename, as created in `cached`
+    :return: Whether the file holds a value with the given prefix
+    '''
+    key = filename.removeprefix(prefix).removesuffix(".pickle")
+    return filename == f"{prefix}{key}.pickle" and len(key) == 40
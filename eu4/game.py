@@ -1,3 +1,4 @@
+import functools
 import os
 
 from eu4 import files
@@ -68,9 +69,11 @@ class Game:
         '''
         currentFile = os.path.join(self.path, subpath)
         replacingMod = None
+        # Normalize once here instead of once per mod
+        indexKey = _normalizeSubpath(subpath)
         # Apply mods according to load order
         for mod in self.loadOrder:
-            override = mod.overrideFile(subpath)
+            override = mod._overrideFile(subpath, indexKey)
             if override is None: # mod doesn't override the file
                 continue
             currentFile = override
@@ -153,12 +156,37 @@ class Mod:
                     break
             else:
                 raise FileNotFoundError(f"No descriptor in {modPath}")
-        descriptor = Descriptor(descriptorPath)
+        self._loadDescriptor(Descriptor(descriptorPath))
+
+    @classmethod
+    def _fromDescriptor(cls, descriptor: Descriptor, modPath: str) -> "Mod":
+        '''
+        Creates a mod from an already parsed descriptor, skipping the search for and parsing of the
+        descriptor inside the mod directory. Used when loading mods from the launcher's descriptor files,
+        which hold the same data.
+
+        :param descriptor: The mod's descriptor
+        :param modPath: The path to the mod directory
+        '''
+        if not os.path.exists(modPath):
+            raise FileNotFoundError(f"Mod path not found: {modPath}")
+        mod = cls.__new__(cls)
+        mod.path = modPath
+        mod._loadDescriptor(descriptor)
+        return mod
 
+    def _loadDescriptor(self, descriptor: Descriptor):
+        '''
+        Sets the mod's metadata from its descriptor. `Mod.path` must already be set.
+
+        :param descriptor: The mod's descriptor
+        '''
         self.name = descriptor.name
         self.bytename = self.name.encode("cp1252")
+        # mods are hashed a lot while sorting the load order, so only hash the name once
+        self._hash = hash(self.name)
 
-        directoryName = os.path.split(modPath)[1]
+        directoryName = os.path.split(self.path)[1]
         try:
             self.technicalName = int(directoryName)
         except ValueError:
@@ -172,7 +200,47 @@ class Mod:
         return f"Mod({self.technicalName}, {self.name})"
 
     def __hash__(self) -> int:
-        return hash(self.name)
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        # identity check first, as set lookups almost always compare a mod with itself
+        return self is other or (isinstance(other, Mod) and self.name == other.name)
+
+    @functools.cached_property
+    def fileIndex(self) -> frozenset[str]:
+        '''
+        The subpaths of all files in the mod directory, normalized with `game._normalizeSubpath`. The
+        directory is walked once, the first time this is accessed, so that later file lookups don't
+        need to touch the file system.
+        '''
+        index = set()
+        loopingLinks = set()
+        # symlinked directories are followed like any other, as os.path.exists would. The real paths of the
+        #  directories being walked are tracked so that a link back into one of them isn't followed forever
+        walking = {self.path: frozenset()}
+        for root, directories, filenames in os.walk(self.path, followlinks=True):
+            ancestors = walking.pop(root) | {os.path.realpath(root)}
+            for directory in list(directories):
+                path = os.path.join(root, directory)
+                if os.path.realpath(path) in ancestors:
+                    directories.remove(directory)
+                    loopingLinks.add(_normalizeSubpath(os.path.relpath(path, self.path)) + os.sep)
+                else:
+                    walking[path] = ancestors
+            for filename in filenames:
+                subpath = os.path.relpath(os.path.join(root, filename), self.path)
+                index.add(_normalizeSubpath(subpath))
+        # the files behind these links aren't in the index, see Mod._needsFileSystem
+        self._loopingLinks = frozenset(loopingLinks)
+        return frozenset(index)
+
+    @functools.cached_property
+    def _caseFoldedFileIndex(self) -> frozenset[str]:
+        '''
+        The entries of `Mod.fileIndex`, case-folded. Used to find files that might only differ from a subpath
+        in case.
+        '''
+        return frozenset(subpath.casefold() for subpath in self.fileIndex)
     
     def overrideFile(self, subpath: str) -> str | None:
         '''
@@ -183,8 +251,23 @@ class Mod:
 
         :param subpath: A file path relative to the game directory
         '''
+        return self._overrideFile(subpath, _normalizeSubpath(subpath))
+
+    def _overrideFile(self, subpath: str, indexKey: str) -> str | None:
+        '''
+        Implementation of `Mod.overrideFile` for callers that have already normalized the subpath, such as
+        `Game.getFile` which checks the same subpath against every loaded mod.
+
+        :param subpath: A file path relative to the game directory
+        :param indexKey: The subpath normalized with `game._normalizeSubpath`
+        '''
         moddedFile = os.path.join(self.path, subpath)
-        if os.path.exists(moddedFile):
+        if os.pardir in subpath.replace("\\", "/").split("/"):
+            # normpath resolves ".." without following symlinks, so the index can't be trusted
+            provided = os.path.exists(moddedFile)
+        else:
+            provided = indexKey in self.fileIndex or (self._needsFileSystem(indexKey) and os.path.exists(moddedFile))
+        if provided:
             return moddedFile
         # The mod doesn't provide the file
         # If it then replaces the parent directory of the file, it's effectively removed
@@ -194,6 +277,29 @@ class Mod:
         # The mod doesn't provide the file and doesn't replace it
         return None
 
+    def _needsFileSystem(self, indexKey: str) -> bool:
+        '''
+        Checks whether a subpath that isn't in `Mod.fileIndex` might still be provided by the mod, so that the
+        file system has to be checked instead. This is the case if:
+        - The mod has a file that only differs in case, as some file systems are case-insensitive even where
+          normcase doesn't change the case (such as macOS)
+        - The subpath goes through a symlink back into one of its parent directories, which isn't indexed
+
+        :param indexKey: The subpath normalized with `game._normalizeSubpath`
+        '''
+        return (indexKey.casefold() in self._caseFoldedFileIndex
+            or any(indexKey.startswith(link) for link in self._loopingLinks))
+
+
+def _normalizeSubpath(subpath: str) -> str:
+    '''
+    Normalizes a subpath so that it can be compared with the entries of `Mod.fileIndex`. On Windows
+    this makes the comparison case-insensitive and separator-agnostic, like the file system itself.
+
+    :param subpath: A file path relative to the game or mod directory
+    '''
+    return os.path.normcase(os.path.normpath(subpath))
+
 
 def getAllMods(documentsPath: str) -> set[Mod]:
     '''
@@ -239,7 +345,7 @@ def getModsFromDescriptors(descriptorPaths: list[str]) -> set[Mod]:
             if archivePath is None:
                 raise KeyError(f"No path or archive in descriptor: {descriptorPath}")
             modPath = os.path.split(archivePath)[0]
-        mods.add(Mod(modPath))
+        mods.add(Mod._fromDescriptor(descriptor, modPath))
     
     return mods
 
@@ -268,11 +374,16 @@ def findLoadOrder(mods: set[Mod]) -> list[Mod]:
     # calculate load order
     # mods are sorted alphabetically, then dependencies are moved before the mod(s) that depends on them
     loadOrder = []
-    modSortOrder = sorted(list(mods), key=lambda mod: mod.bytename)
+    loaded: set[Mod] = set() # mirrors loadOrder for constant-time membership checks
+    modSortOrder = sorted(mods, key=lambda mod: mod.bytename)
     for mod in modSortOrder:
-        if mod in loadOrder: # already added (due to dependency)
+        if mod in loaded: # already added (due to dependency)
             continue
-        loadOrder.extend([dependent for dependent in dependents.get(mod, []) if dependent not in loadOrder])
+        for dependent in dependents.get(mod, []):
+            if dependent not in loaded:
+                loadOrder.append(dependent)
+                loaded.add(dependent)
         loadOrder.append(mod)
+        loaded.add(mod)
     
     return loadOrder
@@ -1,21 +1,62 @@
 import itertools
+import numpy as np
 import PIL.Image as img
 import PIL.ImageChops as chops
 
+# The pixel-heavy work in this package is done through numpy, but the remaining PIL operations (pasting,
+#  converting, compositing and resizing) can be sped up further by installing Pillow-SIMD, which is a
+#  drop-in replacement for Pillow
+
+# Maps black to black and every other shade to white, for use with Image.point
+# Built once here instead of on every call
+_FLATTEN_TABLE = bytes([0] + [255] * 255)
+
+# Maps every byte to the two bytes you get by doubling each of its bits
+_DOUBLED_BITS = np.packbits(np.unpackbits(np.arange(256, dtype=np.uint8)[:, np.newaxis], axis=1).repeat(2, axis=1), axis=1)
+
 
 # Generic RGB bitmap object
 class Bitmap:
-    bitmap: img.Image
+    # Slots keep the many small bitmaps (such as province masks) light, subclasses that don't declare their own
+    #  slots still get a regular __dict__
+    __slots__ = ("_bitmap", "_array")
+
+    # The image itself
+    # Replacing it also drops the array of the old image's pixels (see array), so the old image isn't kept alive
+    @property
+    def bitmap(self) -> img.Image:
+        return self._bitmap
+
+    @bitmap.setter
+    def bitmap(self, image: img.Image):
+        self._bitmap = image
+        self._array = None
 
     # Loads an image from a file
+    # PIL normally waits until the pixels are first used to read them, but they're read right away here so
+    #  that the work happens wherever the image is loaded (often a worker thread) and the file is closed
+    # The path is handed to PIL as is, which lets it memory-map uncompressed images instead of reading them
     def load(self, path: str):
-        self.bitmap = img.open(path)
+        with img.open(path) as image:
+            image.load()
+        self.bitmap = image
 
     # Outputs the image to a file
     # Format is PNG to avoid losing transparency information if it exists
     def save(self, path: str):
         self.bitmap.save(path, "PNG")
 
+    # The image's pixels as a read-only numpy array
+    # Converting an image copies all of its pixels, so the array is kept until the image is replaced
+    # Changes made to the image in place won't show up in the array
+    @property
+    def array(self) -> np.ndarray:
+        if self._array is None:
+            array = np.asarray(self._bitmap)
+            array.flags.writeable = False
+            self._array = array
+        return self._array
+
     # Doubles the size of the image
     def double(self):
         self.bitmap = self.bitmap.resize((self.bitmap.width * 2, self.bitmap.height * 2), img.Resampling.NEAREST)
@@ -23,6 +64,8 @@ class Bitmap:
 
 # Bitmap with three channels
 class RGB(Bitmap):
+    __slots__ = ()
+
     def __init__(self, image: img.Image):
         if image.mode != "RGB":
             raise ValueError("RGB must be RGB")
@@ -31,6 +74,8 @@ class RGB(Bitmap):
 
 # Bitmap with four channels
 class RGBA(Bitmap):
+    __slots__ = ()
+
     def __init__(self, image: img.Image):
         if image.mode != "RGBA":
             raise ValueError("RGBA must be RGBA")
@@ -43,6 +88,8 @@ class RGBA(Bitmap):
 
 # Bitmap with a single channel
 class Grayscale(Bitmap):
+    __slots__ = ()
+
     def __init__(self, image: img.Image):
         if image.mode != "L":
             raise ValueError("Grayscale must be grayscale")
@@ -50,7 +97,7 @@ class Grayscale(Bitmap):
 
     # Map non-black pixels to white (essentially making the image binary)
     def flattened(self) -> "Grayscale":
-        return Grayscale(self.bitmap.point(lambda p: 255 if p else 0))
+        return Grayscale(self.bitmap.point(_FLATTEN_TABLE))
     
     # Invert colors
     def inverted(self) -> "Grayscale":
@@ -63,6 +110,8 @@ class Grayscale(Bitmap):
 
 
 class Palette(Bitmap):
+    __slots__ = ()
+
     def __init__(self, image: img.Image):
         if image.mode != "P":
             raise ValueError("Palette must be paletted")
@@ -85,14 +134,42 @@ class Palette(Bitmap):
 
 
 # Bitmap with a single channel that uses only 1 bit per pixel
-# Loaded from raw binary data
+# Loaded from raw binary data, where each row is padded to a whole number of bytes
+# The packed rows are kept as a (height, row bytes) array so numpy can work on the bits directly
 class Binary(Bitmap):
-    def __init__(self, size: tuple[int, int], data: bytearray):
-        self.bitmap = img.frombytes("1", size, data)
+    __slots__ = ("packed", "_grid")
+
+    packed: np.ndarray # only replaced through _setPacked, which also drops the cached grid
 
+    def __init__(self, size: tuple[int, int], data: bytes | np.ndarray):
+        self._setPacked(size, np.frombuffer(data, dtype=np.uint8).reshape(size[1], -1))
+
+    def _setPacked(self, size: tuple[int, int], packed: np.ndarray):
+        self.packed = packed
+        self._grid = None
+        self.bitmap = img.frombytes("1", size, packed)
+
+    # Doubles the size of the image without unpacking it
+    # Every byte is widened to two bytes with each bit doubled, then every row is repeated
+    def double(self):
+        width, height = self.bitmap.size
+        # the doubled rows may end up one byte longer than the new width needs
+        doubledRows = _DOUBLED_BITS[self.packed].reshape(height, -1)[:, :(width * 2 + 7) // 8]
+        self._setPacked((width * 2, height * 2), doubledRows.repeat(2, axis=0))
+
+    # The pixels as a read-only (height, width) boolean array
+    # Unpacking is kept until the image changes, since the same mask is often used many times
+    @property
+    def grid(self) -> np.ndarray:
+        if self._grid is None:
+            grid = np.unpackbits(self.packed, axis=1, count=self.bitmap.width).view(bool)
+            grid.flags.writeable = False
+            self._grid = grid
+        return self._grid
+
+    # Flipping the packed bits also flips the row padding, but that is never read
     def inverted(self) -> "Binary":
-        invertedBytes = bytearray(self.bitmap.point(lambda p: 0 if p else 1).tobytes())
-        return Binary(self.bitmap.size, invertedBytes)
+        return Binary(self.bitmap.size, np.invert(self.packed))
 
 
 # Overlays one image on top of another according to a mask
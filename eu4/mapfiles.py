@@ -8,13 +8,24 @@ other files will require a DefaultMap object to be loaded, as that is where thei
 filenames can be changed).
 '''
 
+import concurrent.futures
+import functools
 import math
+import numpy as np
 import PIL.Image as img
+import re
 
+from collections.abc import Mapping
 from eu4 import files
 from eu4 import game
 from eu4 import image
 
+_TRAILING_NON_DIGITS = re.compile(r"\D+$")
+
+# Tree colors that are not valid for terrain assignment (hardcoded)
+# These map to "palms" and "savana" in the terrain definition
+_INVALID_TREE_COLORS = [12, 27, 28, 29, 30]
+
 
 class Canal(image.Palette):
     '''
@@ -22,6 +33,8 @@ class Canal(image.Palette):
     specified coordinates. This also means the palette of the canal bitmap should be the same as the river bitmap.
     '''
 
+    __slots__ = ("name", "coords")
+
     name: str
     '''The name of the canal'''
     coords: tuple[int, int]
@@ -55,14 +68,14 @@ class DefaultMap(files.ScopeFile):
     the highest possible province ID. (Note: In the actual file, this number is 1 higher for some reason)'''
     seas: list[int]
     '''The province IDs of all sea provinces'''
+    seaSet: frozenset[int]
+    '''The same as `DefaultMap.seas`, but as a set for fast membership checks'''
     rnw: list[int]
     '''The province IDs of all RNW provinces'''
     lakes: list[int]
     '''The province IDs of all lake provinces'''
     forcedCoasts: list[int]
     '''The province IDs of all "forced coastal" provinces. What this actually means is unclear'''
-    canals: list[Canal]
-    '''A list of all defined canals'''
     provinceDefinition: str
     '''The filename of `mapfiles.ProvinceDefinition`. Is `definition.csv` in vanilla'''
     provinceMap: str
@@ -110,6 +123,7 @@ class DefaultMap(files.ScopeFile):
         self.height = self.scope.getConst("height")
         self.maxProvinces = self.scope.getConst("max_provinces") - 1 # the -1 is important!
         self.seas = self.scope.getArray("sea_starts", default=[])
+        self.seaSet = frozenset(self.seas)
         self.rnw = self.scope.getArray("only_used_for_random", default=[])
         self.lakes = self.scope.getArray("lakes", default=[])
         self.forcedCoasts = self.scope.getArray("force_coastal", default=[])
@@ -131,7 +145,18 @@ class DefaultMap(files.ScopeFile):
         self.ambientObjects = self.scope.getConst("ambient_object")
         self.seasons = self.scope.getConst("seasons")
         self.tradeWinds = self.scope.getConst("trade_winds")
-        self.canals = [Canal(game, canalScope) for canalScope in self.scope.getAll("canal_definitions")]
+        self._game = game
+
+    @functools.cached_property
+    def canals(self) -> list[Canal]:
+        '''
+        A list of all defined canals. The canal tiles are only loaded the first time this is accessed, as most
+        uses of the map never need them.
+        '''
+        # Canal tiles are independent bitmap files, so they can be loaded in parallel
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            canalScopes = self.scope.getAll("canal_definitions")
+            return list(executor.map(lambda canalScope: Canal(self._game, canalScope), canalScopes))
 
 
 class ProvinceMask(image.Binary):
@@ -139,6 +164,8 @@ class ProvinceMask(image.Binary):
     Efficient storage of a province's shape as a binary mask.
     '''
 
+    __slots__ = ("color", "boundingBox")
+
     color: tuple[int, int, int]
     '''The RGB color of the province'''
     boundingBox: tuple[int, int, int, int]
@@ -146,36 +173,93 @@ class ProvinceMask(image.Binary):
     bottom + 1), aka (top-left pixel, bottom-right pixel + (1,1)). The rectangle defined by these coordinates
     is the smallest rectangle that contains the province's shape'''
 
-    def __init__(self, color: tuple[int, int, int], coordinateList: tuple[list[int], list[int]]):
+    def __init__(self, color: tuple[int, int, int], grid: np.ndarray, boundingBox: tuple[int, int, int, int]):
         '''
         :param color: The RGB color of the province
-        :param coordinateList: Two lists, the first containing the x-coordinates of the pixels
-        of the province, and the second containing the y-coordinates. These should be in the same order
+        :param grid: The shape of the province within its bounding box, as a (height, width) boolean array
+        :param boundingBox: The bounding box of the province
         '''
         self.color = color
-        xs, ys = coordinateList
-        # the bottom-right corner is actually outside the bounding box
-        self.boundingBox = left, top, right, bottom = (min(xs), min(ys), max(xs) + 1, max(ys) + 1)
-        width, height = right - left, bottom - top
+        self.boundingBox = boundingBox
+        height, width = grid.shape
         # Binary image creation works row-by-row, and when a row ends before a byte does,
         #  the rest of the byte is skipped
-        # To avoid this, we need to pad the width
-        paddedWidth = (width + 7) // 8 * 8 # round up to the nearest multiple of 8
-        data = bytearray(paddedWidth * height)
-        for x, y in zip(xs, ys):
-            bit = (x - left) + (y - top) * paddedWidth
-            byte = bit // 8
-            bitInByte = bit % 8
-            data[byte] |= 1 << (7 - bitInByte)
-        super().__init__((width, height), data)
+        # Packing each row separately pads it to a whole number of bytes in the same way
+        super().__init__((width, height), np.packbits(grid, axis=1))
+
+    def double(self):
+        '''
+        Doubles the size of this mask, along with its bounding box.
+        '''
+        left, top, right, bottom = self.boundingBox
+        self.boundingBox = (left * 2, top * 2, right * 2, bottom * 2)
+        super().double()
+
+class _LazyMasks(Mapping[int, ProvinceMask]):
+    '''
+    A read-only mapping of province IDs to province masks, where each mask is only created the first time
+    it's accessed.
+    '''
+
+    def __init__(
+            self,
+            colors: dict[int, tuple[int, int, int]],
+            idMap: np.ndarray,
+            boundingBoxes: dict[int, tuple[int, int, int, int]]
+        ):
+        '''
+        :param colors: A dictionary of province IDs to their respective RGB color
+        :param idMap: The province ID of every pixel in the map, as a (height, width) array
+        :param boundingBoxes: A dictionary of province IDs to their bounding boxes, in the order the masks should be
+        iterated in
+        '''
+        self._colors = colors
+        self._idMap = idMap
+        self._boundingBoxes = boundingBoxes
+        self._order = list(boundingBoxes)
+        self._masks: dict[int, ProvinceMask] = {}
+
+    def __getitem__(self, province: int) -> ProvinceMask:
+        mask = self._masks.get(province)
+        if mask is None:
+            # the province is wherever its ID is within its bounding box
+            left, top, right, bottom = boundingBox = self._boundingBoxes[province]
+            grid = self._idMap[top:bottom, left:right] == province
+            mask = self._masks[province] = ProvinceMask(self._colors[province], grid, boundingBox)
+        return mask
+
+    def double(self, idMap: np.ndarray):
+        '''
+        Doubles the size of all masks. Masks that haven't been created yet will be created from the new ID map.
+
+        :param idMap: The doubled ID map
+        '''
+        for mask in self._masks.values():
+            mask.double()
+        self._idMap = idMap
+        self._boundingBoxes = {province: (left * 2, top * 2, right * 2, bottom * 2)
+            for province, (left, top, right, bottom) in self._boundingBoxes.items()}
+
+    def __contains__(self, province: object) -> bool:
+        # don't create the mask just to check for it
+        return province in self._boundingBoxes
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __len__(self) -> int:
+        return len(self._order)
 
 class ProvinceMap(image.RGB):
     '''
     The province bitmap. Each RGB color represents a province.
     '''
 
-    masks: dict[int, ProvinceMask]
-    '''A dictionary of province IDs to their respective masks'''
+    idMap: np.ndarray
+    '''The province ID of every pixel in the map, as a (height, width) array. Pixels with undefined colors are 0'''
+    masks: _LazyMasks
+    '''A dictionary-like mapping of province IDs to their respective masks. Masks are created the first
+    time they're accessed'''
     provinces: list[int]
     '''A list of all province IDs in the map'''
 
@@ -187,40 +271,88 @@ class ProvinceMap(image.RGB):
         '''
         provincesPath = game.getFile(f"map/{defaultMap.provinceMap}")
         self.load(provincesPath)
-    
-        # for each color, store all x and y coordinates of pixels with that color
-        coordinateList: dict[tuple[int, int, int], tuple[list[int], list[int]]] = {}
-        x, y = 0, 0
-        for pixel in self.bitmap.getdata(): # type: ignore
-            color: tuple[int, int, int] = pixel
-            xs, ys = coordinateList.setdefault(color, ([], []))
-            xs.append(x)
-            ys.append(y)
-            x += 1
-            if x == self.bitmap.width: # clearer than modulo increment!
-                x = 0
-                y += 1
-
-        # create provinces and masks
-        self.masks = {}
-        self.provinces = []
-        for color, coordinates in coordinateList.items():
-            province = definition.province.get(color)
-            if province is None: # undefined province
+
+        # grouping the pixels is by far the slowest part of loading, so the result is cached on disk
+        #  for as long as neither the map nor the definition changes
+        self.idMap, boundingBoxes = files.cached("provinceIDs", [provincesPath, definition.path], lambda: self._groupPixels(definition))
+        if self.bitmap.mode == "P": # everything else expects an RGB province map
+            self.bitmap = self.bitmap.convert("RGB")
+
+        # masks are only created when needed
+        self.provinces = list(boundingBoxes)
+        self.masks = _LazyMasks(definition.color, self.idMap, boundingBoxes)
+
+    def _groupPixels(self, definition: "ProvinceDefinition") -> tuple[np.ndarray, dict[int, tuple[int, int, int, int]]]:
+        '''
+        Finds the province of every pixel in the map, and the bounding box of every province.
+
+        :param definition: The province definition object
+        :return: The ID map (see `ProvinceMap.idMap`), and a dictionary of province IDs to their bounding boxes, in
+        the order the provinces first appear in the map. Undefined provinces are left out
+        '''
+        # colors are packed into single integers and resolved to province IDs through the definition's
+        #  lookup table, so numpy can sort and group them
+        pixels = self.array
+        height, width = pixels.shape[:2]
+        if self.bitmap.mode == "P":
+            # paletted maps only need their (at most 256) palette colors resolved, which the pixels can
+            #  then index directly
+            palette = np.zeros((256, 3), dtype=np.uint32)
+            paletteColors = np.array(self.bitmap.getpalette("RGB") or [], dtype=np.uint32).reshape(-1, 3)
+            palette[:len(paletteColors)] = paletteColors
+            paletteIDs = definition.provinceLUT[palette[:, 0] << 16 | palette[:, 1] << 8 | palette[:, 2]]
+            idMap = paletteIDs[pixels]
+        else:
+            # this is done in horizontal strips, so the packed colors only ever exist for a few hundred rows
+            #  at a time instead of as several full-size temporary arrays
+            # each strip's colors are packed in place into the same buffer, so no temporaries are created
+            idMap = np.empty((height, width), dtype=definition.provinceLUT.dtype)
+            keyBuffer = np.empty((min(height, 256), width), dtype=np.uint32)
+            for top in range(0, height, 256):
+                strip = pixels[top:top + 256]
+                keys = keyBuffer[:len(strip)]
+                np.copyto(keys, strip[..., 0])
+                keys <<= 8
+                keys |= strip[..., 1]
+                keys <<= 8
+                keys |= strip[..., 2]
+                idMap[top:top + 256] = definition.provinceLUT[keys]
+        provinceIDs, firstIndices, inverse = np.unique(idMap.ravel(), return_index=True, return_inverse=True)
+        # sorting and counting the smallest possible integer type is faster, as numpy can radix sort
+        #  16-bit integers
+        inverse = inverse.astype(np.min_scalar_type(len(provinceIDs) - 1))
+        # a stable sort keeps each province's pixels in row-major order
+        order = np.argsort(inverse, kind="stable")
+        counts = np.bincount(inverse)
+        ends = np.cumsum(counts)
+        starts = ends - counts
+
+        # the bounding boxes of all provinces are found at once from the sorted pixels
+        # each province's pixels are in row-major order, so its first and last pixels are on its top
+        #  and bottom rows
+        tops = order[starts] // width
+        bottoms = order[ends - 1] // width + 1
+        columns = order % width
+        lefts = np.minimum.reduceat(columns, starts)
+        rights = np.maximum.reduceat(columns, starts) + 1
+
+        boundingBoxes = {}
+        for provinceIndex in np.argsort(firstIndices):
+            province = int(provinceIDs[provinceIndex])
+            if province == 0: # undefined province
                 continue
-            self.masks[province] = ProvinceMask(color, coordinates)
-            self.provinces.append(province)
+            boundingBoxes[province] = (int(lefts[provinceIndex]), int(tops[provinceIndex]),
+                int(rights[provinceIndex]), int(bottoms[provinceIndex]))
+        return idMap, boundingBoxes
 
     def double(self):
         '''
         Doubles the size of this map and all its masks. This can be useful when generating borders for very small provinces,
         as borders will be half as wide if generated from a double-size map.
         '''
-        self.bitmap = self.bitmap.resize((self.bitmap.width * 2, self.bitmap.height * 2), img.Resampling.NEAREST)
-        for mask in self.masks.values():
-            left, top, right, bottom = mask.boundingBox
-            mask.boundingBox = (left * 2, top * 2, right * 2, bottom * 2)
-            mask.bitmap = mask.bitmap.resize((mask.bitmap.width * 2, mask.bitmap.height * 2), img.Resampling.NEAREST)
+        super().double()
+        self.idMap = self.idMap.repeat(2, axis=0).repeat(2, axis=1)
+        self.masks.double(self.idMap)
 
 
 class ProvinceDefinition(files.CsvFile):
@@ -230,9 +362,9 @@ class ProvinceDefinition(files.CsvFile):
 
     color: dict[int, tuple[int, int, int]]
     '''A dictionary of province IDs to their respective RGB color'''
-    province: dict[tuple[int, int, int], int]
-    '''A dictionary of RGB colors to their respective province IDs. Note that the game allows invalid colors to be
-    defined on the province map, so use `dict.get` for null safety'''
+    province: dict[int, int]
+    '''A dictionary of RGB colors, packed with `mapfiles.packColor`, to their respective province IDs. Note that the
+    game allows invalid colors to be defined on the province map, so use `dict.get` for null safety'''
 
     def __init__(self, game: game.Game, defaultMap: DefaultMap):
         '''
@@ -241,21 +373,42 @@ class ProvinceDefinition(files.CsvFile):
         '''
         definitionPath = game.getFile(f"map/{defaultMap.provinceDefinition}")
         super().__init__(definitionPath)
-        self.color = {}
-        self.province = {}
-        for row in self:
-            if len(row) < 5:
-                continue
-            province, red, green, blue, *_ = row
-            if not province or not red or not green or not blue:
-                continue
-            province = int(province)
-            try:
-                color = (int(red), int(green), int(blue))
-            except ValueError: # see _strToIntWeird below
-                color = (_strToIntWeird(red), _strToIntWeird(green), _strToIntWeird(blue))
-            self.color[province] = color
-            self.province[color] = province
+        # parse the ID and color of every valid row at once
+        fields = np.array([row[:4] for row in self if len(row) >= 5 and all(row[:4])], dtype=str).reshape(-1, 4)
+        provinces = fields[:, 0].astype(np.int64)
+        try:
+            colors = fields[:, 1:].astype(np.int64)
+        except ValueError: # see _strToIntWeird below
+            colors = np.array([[_strToIntWeird(value) for value in color] for color in fields[:, 1:]], dtype=np.int64).reshape(-1, 3)
+        self.color = dict(zip(provinces.tolist(), map(tuple, colors.tolist())))
+        # colors outside of 0-255 can't appear in the province map
+        valid = ((colors >= 0) & (colors <= 255)).all(axis=1)
+        packedColors = colors[valid, 0] << 16 | colors[valid, 1] << 8 | colors[valid, 2]
+        self.province = dict(zip(packedColors.tolist(), provinces[valid].tolist()))
+
+    @functools.cached_property
+    def provinceLUT(self) -> np.ndarray:
+        '''
+        A lookup table of every possible RGB color, packed with `mapfiles.packColor`, to its province ID. Undefined
+        colors map to 0. The table has 2^24 entries, so it's only created the first time it's accessed.
+        '''
+        # the smallest integer type that fits every province ID keeps the table small
+        packedColors = np.array(list(self.province), dtype=np.uint32)
+        provinceIDs = np.array(list(self.province.values()))
+        provinceLUT = np.zeros(1 << 24, dtype=np.min_scalar_type(max(self.province.values(), default=0)))
+        provinceLUT[packedColors] = provinceIDs
+        return provinceLUT
+
+def packColor(color: tuple[int, int, int]) -> int:
+    '''
+    Packs an RGB color into a single integer, as `(red << 16) | (green << 8) | blue`. Packed colors hash and
+    compare faster than tuples, and are what `ProvinceDefinition.province` is keyed by.
+
+    :param color: The RGB color to pack
+    :return: The packed color
+    '''
+    red, green, blue = color
+    return red << 16 | green << 8 | blue
 
 def _strToIntWeird(value: str) -> int:
     '''
@@ -268,9 +421,7 @@ def _strToIntWeird(value: str) -> int:
     # I have only seen this feature in action in the definition.csv for Voltaire's Nightmare (where "104o"
     #  is successfully parsed as 104)
     # It would be odd to implement this behavior intentionally, so it's likely an unintentional quirk of the parser
-    while not value[-1].isdigit():
-        value = value[:-1]
-    return int(value)
+    return int(_TRAILING_NON_DIGITS.sub("", value))
 
 
 class Climate(files.ScopeFile):
@@ -352,6 +503,8 @@ class ProvincePositions():
     province.
     '''
 
+    __slots__ = ("city", "unit", "text", "port", "tradeNode", "battle", "tradeWind")
+
     city: tuple[float, float]
     '''The position of the city sprawl model'''
     unit: tuple[float, float]
@@ -422,6 +575,8 @@ class Adjacency:
     A custom movement connection between two provinces.
     '''
 
+    __slots__ = ("fromProvince", "toProvince", "throughProvince", "adjacencyType", "line")
+
     fromProvince: int
     '''The province ID of the origin province'''
     toProvince: int
@@ -439,11 +594,30 @@ class Adjacency:
         '''
         :param raw: A row of adjacency data from the adjacencies file
         '''
-        self.fromProvince = int(raw[0])
-        self.toProvince = int(raw[1])
-        self.adjacencyType = AdjacencyType(raw[2])
-        self.throughProvince = int(raw[3])
-        self.line = (int(raw[4]), int(raw[5]), int(raw[6]), int(raw[7]))
+        self._setFields(raw[2], [int(raw[0]), int(raw[1]), int(raw[3]), int(raw[4]), int(raw[5]), int(raw[6]), int(raw[7])])
+
+    @classmethod
+    def fromFields(cls, adjacencyType: str, numbers: list[int]) -> "Adjacency":
+        '''
+        Creates an adjacency from a row of adjacency data whose numbers have already been parsed. Used when
+        parsing many rows at once.
+
+        :param adjacencyType: The adjacency type, as written in the adjacencies file
+        :param numbers: The numeric fields of the row, in order and without the adjacency type: the origin,
+        destination and crossed province IDs followed by the line coordinates
+        :return: The adjacency
+        '''
+        adjacency = cls.__new__(cls)
+        adjacency._setFields(adjacencyType, numbers)
+        return adjacency
+
+    def _setFields(self, adjacencyType: str, numbers: list[int]):
+        '''
+        Sets the adjacency's attributes from its parsed fields, as described in `Adjacency.fromFields`.
+        '''
+        self.fromProvince, self.toProvince, self.throughProvince, *line = numbers
+        self.adjacencyType = AdjacencyType.parse(adjacencyType)
+        self.line = (line[0], line[1], line[2], line[3])
         if self.line == (-1, -1, -1, -1):
             self.line = None
 
@@ -462,7 +636,9 @@ class Adjacencies(files.CsvFile):
         '''
         adjacenciesPath = game.getFile(f"map/{defaultMap.adjacencies}")
         super().__init__(adjacenciesPath)
-        self.adjacencies = [Adjacency(adjacency) for adjacency in self]
+        # convert the numeric fields of every row at once, skipping the adjacency type
+        numbers = np.array([row[:2] + row[3:8] for row in self], dtype=str).reshape(-1, 7).astype(np.int64).tolist()
+        self.adjacencies = [Adjacency.fromFields(row[2], rowNumbers) for row, rowNumbers in zip(self, numbers)]
 
 
 class RiverMap(image.Palette):
@@ -493,12 +669,8 @@ class TreeMap(image.Palette):
     tree bitmap is used for terrain assignment, where some tree types can affect the terrain type of a province.
     '''
 
-    resizedBitmap: img.Image
-    '''A copy of this map resized to the same dimensions as the terrain map'''
-
-    treeTerrainMap: img.Image
-    '''A copy of this map resized to the same dimensions as the terrain map, but using EU4's own (weird) algorithm.
-    Used for terrain assignment'''
+    treeTerrainPixels: np.ndarray
+    '''The palette indices of `TreeMap.treeTerrainMap`, as a (height, width) array. Used for terrain assignment'''
 
     def __init__(self, game: game.Game, defaultMap: DefaultMap):
         '''
@@ -507,8 +679,7 @@ class TreeMap(image.Palette):
         '''
         treePath = game.getFile(f"map/{defaultMap.treeMap}")
         self.load(treePath)
-        terrainMapSize = (defaultMap.width, defaultMap.height)
-        self.resizedBitmap = self.bitmap.resize(terrainMapSize, img.Resampling.NEAREST)
+        terrainMapSize = self._terrainMapSize = (defaultMap.width, defaultMap.height)
 
         # Resize the tree bitmap using the method used in EU4 when assigning terrain. I reverse-engineered this
         #  by creating one-pixel provinces and checking the terrain assignment in-game, so it may not match
@@ -524,52 +695,91 @@ class TreeMap(image.Palette):
         #  actually placed, this leaves gaps for the terrain from the actual terrain bitmap to show through
         #  when this bitmap is placed on top of it
 
-        # Create the new bitmap
-        self.treeTerrainMap = img.new("P", terrainMapSize, 0)
-        self.treeTerrainMap.putpalette(self.palette())
+        # The result only depends on the tree bitmap and the terrain map size, so it's cached on disk
+        width, height = terrainMapSize
+        self.treeTerrainPixels = files.cached(f"treeTerrain{width}x{height}", [treePath], lambda: self._treeTerrainPixels(terrainMapSize))
+
+    # The resized images are full terrain map size and terrain assignment doesn't need them, so they're only
+    #  created when first accessed
+
+    @functools.cached_property
+    def resizedBitmap(self) -> img.Image:
+        '''
+        A copy of this map resized to the same dimensions as the terrain map.
+        '''
+        return self.bitmap.resize(self._terrainMapSize, img.Resampling.NEAREST)
+
+    @functools.cached_property
+    def treeTerrainMap(self) -> img.Image:
+        '''
+        A copy of this map resized to the same dimensions as the terrain map, but using EU4's own (weird) algorithm.
+        Its pixels are `TreeMap.treeTerrainPixels`.
+        '''
+        treeTerrainMap = img.fromarray(self.treeTerrainPixels)
+        treeTerrainMap.putpalette(self.palette())
+        return treeTerrainMap
+
+    def _treeTerrainPixels(self, terrainMapSize: tuple[int, int]) -> np.ndarray:
+        '''
+        Resizes the tree bitmap using EU4's terrain assignment algorithm, described in `TreeMap.__init__`.
+
+        :param terrainMapSize: The size to resize to, which is the size of the terrain map
+        :return: The resized bitmap's palette indices, as a (height, width) array
+        '''
+        # Create the new bitmap's pixels
+        width, height = terrainMapSize
+        treeTerrainPixels = np.zeros((height, width), dtype=np.uint8)
 
         # Calculate the scaling factors
         # (xRatio, yRatio) is the average size of the upscaled pixels
-        xRatio = self.treeTerrainMap.width / self.bitmap.width
-        yRatio = self.treeTerrainMap.height / self.bitmap.height
+        xRatio = width / self.bitmap.width
+        yRatio = height / self.bitmap.height
+
+        # Calculate the horizontal bounds of every upscaled pixel in a row beforehand
+        # Even rows are shifted left by half a pixel, odd rows aren't
+        columns = np.arange(self.bitmap.width)
+        xBounds = []
+        for shift in (0.5, 0):
+            xStarts = np.floor((columns - shift) * xRatio).astype(int)
+            xEnds = np.ceil((columns + 1 - shift) * xRatio).astype(int) # no clue why this specifically is a ceil
+            xStarts = xStarts.clip(min=0) # clip the left shift at the edge
+            xEnds = xEnds.clip(max=width - 1) # prevent out-of-bounds
+            xBounds.append((xStarts, xEnds))
 
         # Remap the tree bitmap row by row
+        treePixels = np.asarray(self.bitmap)
+        upscaledColumns = np.arange(width)
         for Y in range(self.bitmap.height):
 
-            # Create the upscaled row's base image
-            row = img.new("P", (self.treeTerrainMap.width, 1), 0)
-            row.putpalette(self.palette())
-            # If Y is even, shift the row left by half a pixel
-            # (applied below)
-            shift = 0.5 if Y % 2 == 0 else 0
-
-            # Remap pixels in the row
-            for X in range(self.bitmap.width):
-                pixel: int = self.bitmap.getpixel((X, Y)) # type: ignore
-                # Skip black pixels
-                if pixel == 0:
-                    continue
-                # Place the pixel in the upscaled row, with a left shift if defined
-                xStart = math.floor((X - shift) * xRatio)
-                xEnd = math.ceil((X + 1 - shift) * xRatio) # no clue why this specifically is a ceil
-                xEnd = min(xEnd, row.width - 1) # prevent out-of-bounds
-                row.paste(pixel, (xStart, 0, xEnd, 1))
+            # Black pixels are skipped, so rows without any other pixels can be skipped entirely
+            nonBlack = np.flatnonzero(treePixels[Y])
+            if nonBlack.size == 0:
+                continue
+            xStarts, xEnds = xBounds[Y % 2]
+            xStarts, xEnds = xStarts[nonBlack], xEnds[nonBlack]
+
+            # Remap pixels in the row, with a left shift if defined
+            # Pixels are placed left to right and later pixels overwrite earlier ones, so each upscaled pixel
+            #  comes from the last pixel starting at or before it. The bounds only grow left to right, so if
+            #  that pixel doesn't reach far enough, no earlier pixel does either
+            last = np.searchsorted(xStarts, upscaledColumns, side="right") - 1
+            covered = (last >= 0) & (upscaledColumns < xEnds[last])
+            rowPixels = np.where(covered, treePixels[Y, nonBlack][last], 0).astype(np.uint8)
 
             # Calculate the upper (yEnd) and lower (yStart) bounds of the upscaled row
             # The row is shifted down by half a pixel
             yEnd = math.floor((Y + 0.5) * yRatio)
             yStart = math.floor((Y + 1.5) * yRatio)
-            yStart = min(yStart, self.treeTerrainMap.height - 1) # prevent out-of-bounds
-            
-            # Paste copies of the upscaled row every other row starting from Ystart, going up to Yend
-            y = yStart
-            while y >= yEnd:
-                # Mask out black pixels
-                mask = row.point(lambda p: 1 if p != 0 else 0, mode="1")
-                self.treeTerrainMap.paste(row, (0, y), mask)
-                y -= 2
-        
-        # Done!
+            yStart = min(yStart, height - 1) # prevent out-of-bounds
+            if yStart < yEnd:
+                continue
+
+            # Copy the upscaled row into every other row starting from yStart, going up to yEnd
+            # All copies are written at once through a strided view, masking out black pixels
+            yTop = yStart - (yStart - yEnd) // 2 * 2
+            np.copyto(treeTerrainPixels[yTop:yStart + 1:2], rowPixels, where=rowPixels != 0)
+
+        return treeTerrainPixels
 
 
 class TerrainMap(image.Palette):
@@ -621,6 +831,8 @@ class Terrain:
     A terrain, or more accurately a terrain category.
     '''
 
+    __slots__ = ("name", "color", "gameplayType", "soundType", "isWater", "isInlandSea", "overrides")
+
     name: str
     '''The name of the terrain'''
     color: tuple[int, int, int]
@@ -644,8 +856,8 @@ class Terrain:
         '''
         self.name = name
         self.color = tuple(scope.getArray("color", default=(255, 255, 255)))
-        self.gameplayType = TerrainGameplayType(scope.getConst("type", default=None))
-        self.soundType = TerrainSoundType(scope.getConst("sound_type", default=None))
+        self.gameplayType = TerrainGameplayType.parse(scope.getConst("type", default=None))
+        self.soundType = TerrainSoundType.parse(scope.getConst("sound_type", default=None))
         self.isWater = scope.getConst("is_water", default=False)
         self.isInlandSea = scope.getConst("inland_sea", default=False)
         self.overrides = scope.getArray("terrain_override", default=[])
@@ -670,6 +882,13 @@ class TerrainDefinition(files.ScopeFile):
     '''A list of all defined terrains'''
     defaultTerrain: Terrain
     '''Is always `pti`. Used when a province cannot be assigned a terrain'''
+    _colorLUT: np.ndarray
+    '''Maps palette indices in the terrain map, followed by palette indices in the tree map offset by 256, to
+    positions in `TerrainDefinition.terrains`, or -1 if they aren't counted'''
+    _colorWeights: np.ndarray
+    '''How much a pixel of each color in `TerrainDefinition._colorLUT` counts towards its terrain'''
+    _colorTiebreakers: np.ndarray
+    '''The tiebreaker value of each color in `TerrainDefinition._colorLUT`, lower is preferred'''
 
     def __init__(self, game: game.Game, defaultMap: DefaultMap):
         '''
@@ -714,6 +933,50 @@ class TerrainDefinition(files.ScopeFile):
             for color in colors:
                 self.treeIndex[color] = terrainTags[terrainTag]
 
+        # Lookup tables of the above, so a whole color histogram can be mapped to terrains at once
+        # Terrain map colors come first, then tree map colors offset by 256
+        terrainPositions = {terrain: position for position, terrain in enumerate(self.terrains)}
+        self._colorLUT = np.full(512, -1)
+        for offset, index in ((0, self.terrainIndex), (256, self.treeIndex)):
+            for color, terrain in index.items():
+                if 0 <= color < 256:
+                    self._colorLUT[offset + color] = terrainPositions[terrain]
+        # these colors are ignored when counting, see getTerrain
+        self._colorLUT[255] = -1
+        self._colorLUT[256 + 0] = -1
+        self._colorLUT[256 + np.array(_INVALID_TREE_COLORS)] = -1
+        # trees count double
+        self._colorWeights = np.repeat([1, 2], 256)
+        # the tiebreaker is just the lowest index in the terrain map
+        # presumably the tree index has a lower priority than the terrain index when
+        #  it comes to tiebreaking, so we add 255 to it
+        self._colorTiebreakers = np.concatenate((np.arange(256), np.arange(256) + 255))
+
+    def getTerrains(
+            self,
+            provinces: list[int],
+            defaultMap: DefaultMap,
+            terrainMap: TerrainMap,
+            provinceMap: ProvinceMap,
+            treeMap: TreeMap,
+            riverMap: RiverMap
+        ) -> dict[int, Terrain]:
+        '''
+        Gets the terrain of multiple provinces, as with `TerrainDefinition.getTerrain`.
+
+        :param provinces: The province IDs
+        :param defaultMap: The `default.map` object
+        :param terrainMap: The terrain bitmap
+        :param provinceMap: The province bitmap
+        :param treeMap: The tree bitmap
+        :param riverMap: The river bitmap
+        :return: A dictionary of the province IDs to their terrains
+        '''
+        return {
+            province: self.getTerrain(province, defaultMap, terrainMap, provinceMap, treeMap, riverMap)
+            for province in provinces
+        }
+
     # Hell On Earth
     def getTerrain(
             self,
@@ -748,86 +1011,71 @@ class TerrainDefinition(files.ScopeFile):
         
         mask = provinceMap.masks[province]
         
-        # Create a crop of the terrain, tree and river maps where the province is
-        rawTerrainCrop = terrainMap.bitmap.crop(mask.boundingBox)
-        rawTreeCrop = treeMap.treeTerrainMap.crop(mask.boundingBox)
-        riverCrop = riverMap.bitmap.crop(mask.boundingBox)
-
-        # Apply the mask to the tree and terrain crops, clearing pixels outside the province
-        rawTerrainCrop.paste(255, (0, 0), mask.inverted().bitmap)
-        rawTreeCrop.paste(0, (0, 0), mask.inverted().bitmap)
-        terrainCrop = rawTerrainCrop.copy()
-        treeCrop = rawTreeCrop.copy()
-
-        # Mask the tree crop over the terrain crop, clearing terrain pixels where there is a defined tree
+        # Crop the terrain, tree and river maps where the province is
+        # These are views into the maps' pixels, and everything below works on whole arrays at once
+        terrainCrop = _cropPixels(terrainMap.array, mask.boundingBox)
+        treeCrop = _cropPixels(treeMap.treeTerrainPixels, mask.boundingBox)
+        riverCrop = _cropPixels(riverMap.array, mask.boundingBox)
+        insideMask = mask.grid
+
+        # Pixels with a defined tree are only counted as trees, never as terrain
         # Ensures there is no overlap between the two when counting colors
-        treeMask = treeCrop.point(lambda p: 1 if p != 0 else 0, mode="1")
-        terrainCrop.paste(255, (0, 0), treeMask)
-
-        # Mask out river pixels from the terrain and tree crops
-        # Only mask out rivers wider than index 3
-        riverMask = riverCrop.point(lambda p: 1 if p > 3 and p < 254 else 0, mode="1") # type: ignore
-        terrainCrop.paste(255, (0, 0), riverMask)
-        treeCrop.paste(0, (0, 0), riverMask)
-
-        # Clear tree colors that are not valid for terrain assignment (hardcoded)
-        # These map to "palms" and "savana" in the terrain definition
-        invalidTreeColors = [12, 27, 28, 29, 30]
-        treeCrop = treeCrop.point(lambda p: 0 if p in invalidTreeColors else p)
-        
+        treeMask = insideMask & (treeCrop != 0)
+
+        # Ignore river pixels on both maps
+        # Only rivers wider than index 3 are ignored
+        riverMask = (riverCrop > 3) & (riverCrop < 254)
+
+        # Count the colors of the pixels that remain, with the province's mask applied
+        # Both maps are counted in a single histogram, with tree colors placed after the 256 terrain colors
+        terrainColors = terrainCrop[insideMask & ~treeMask & ~riverMask]
+        treeColors = treeCrop[treeMask & ~riverMask].astype(np.intp) + 256
+        colorCounts = np.bincount(np.concatenate((terrainColors, treeColors)), minlength=512)
+        provinceTerrains, provinceTrees = colorCounts[:256], colorCounts[256:]
+
+        # Tree colors that are not valid for terrain assignment are left out of the lookup tables, so they
+        #  aren't counted below
+
         # Find the most common terrain in the province
-        # Also store a "tiebreaker" value per terrain, which is just the lowest index in the terrain map
-        terrainCount: dict[Terrain, int] = {}
-        terrainTiebreaker: dict[Terrain, int] = {}
-        provinceTerrains: list[tuple[int, int]] = terrainCrop.getcolors() # type: ignore
-        for count, index in provinceTerrains:
-            if index == 255 or index not in self.terrainIndex:
-                continue
-            terrain = self.terrainIndex[index]
-            terrainCount[terrain] = terrainCount.get(terrain, 0) + count
-            terrainTiebreaker[terrain] = min(terrainTiebreaker.get(terrain, index), index)
-        provinceTrees: list[tuple[int, int]] = treeCrop.getcolors() # type: ignore
-        for count, index in provinceTrees:
-            if index == 0 or index not in self.treeIndex:
-                continue
-            terrain = self.treeIndex[index]
-            terrainCount[terrain] = terrainCount.get(terrain, 0) + count * 2 # trees count double
-            # presumably the tree index has a lower priority than the terrain index when
-            #  it comes to tiebreaking, so we add 255 to it
-            terrainTiebreaker[terrain] = min(terrainTiebreaker.get(terrain, index + 255), index + 255)
-        
+        # Also store a "tiebreaker" value per terrain (see __init__)
+        # Both are tallied from the histogram through the lookup tables, indexed by position in self.terrains
+        colors = np.flatnonzero((colorCounts > 0) & (self._colorLUT >= 0))
+        positions = self._colorLUT[colors]
+        terrainCount = np.bincount(positions, colorCounts[colors] * self._colorWeights[colors], len(self.terrains)).astype(np.int64)
+        terrainTiebreaker = np.full(len(self.terrains), 1024)
+        np.minimum.at(terrainTiebreaker, positions, self._colorTiebreakers[colors])
+
         # Sort the terrains by count, then by tiebreaker
-        terrains = list(terrainCount.keys())
-        terrains.sort(key=lambda terrain: terrainTiebreaker[terrain])
-        terrains.sort(key=lambda terrain: terrainCount[terrain], reverse=True)
+        terrains = [self.terrains[position] for position in np.lexsort((terrainTiebreaker, -terrainCount)) if terrainCount[position] > 0]
         
         if debug:
             import time
-            def show(image: img.Image):
+            def show(pixels: np.ndarray, palette: list[int] | None = None):
+                image = img.fromarray(pixels)
+                if palette:
+                    image.putpalette(palette)
                 image.show()
                 time.sleep(1)
-            show(rawTerrainCrop)
-            show(rawTreeCrop)
+            show(np.where(insideMask, terrainCrop, 255).astype(np.uint8), terrainMap.palette())
+            show(np.where(insideMask, treeCrop, 0).astype(np.uint8), treeMap.palette())
             show(treeMask)
             show(riverMask)
-            show(terrainCrop)
-            show(treeCrop)
-            print(provinceTerrains)
-            print(provinceTrees)
-            print(terrainCount)
-            print(terrainTiebreaker)
+            show(np.where(insideMask & ~treeMask & ~riverMask, terrainCrop, 255).astype(np.uint8), terrainMap.palette())
+            show(np.where(treeMask & ~riverMask & ~np.isin(treeCrop, _INVALID_TREE_COLORS), treeCrop, 0).astype(np.uint8), treeMap.palette())
+            print({index: int(count) for index, count in enumerate(provinceTerrains) if count})
+            print({index: int(count) for index, count in enumerate(provinceTrees) if count and index not in _INVALID_TREE_COLORS})
+            print({terrain: int(count) for terrain, count in zip(self.terrains, terrainCount) if count})
+            print({terrain: int(tiebreaker) for terrain, tiebreaker, count in zip(self.terrains, terrainTiebreaker, terrainCount) if count})
             print(terrains)
 
         # Find the most common color that is a valid terrain
-        while True:
-            if not terrains: # no valid terrains
-                return self.defaultTerrain
-            terrain = terrains.pop(0)
-            # Ignore water terrains if the province is not a sea
-            # Ignore land terrains if the province is a sea
-            if (terrain.isWater) != (province in defaultMap.seas):
-                continue
-            return terrain
+        # Ignore water terrains if the province is not a sea
+        # Ignore land terrains if the province is a sea
+        isSea = province in defaultMap.seaSet
+        for terrain in terrains:
+            if terrain.isWater == isSea:
+                return terrain
+        return self.defaultTerrain # no valid terrains
 
         # TODO: The current algorithm is not perfect. At the moment, every vanilla
         #  province is assigned the correct terrain, but in many mods some provinces
@@ -835,3 +1083,24 @@ class TerrainDefinition(files.ScopeFile):
         #  Overall, though, accuracy is 99%+.
         # One possibility is that not all trees may count double, or that some may be
         #  weighted with a different factor such as x1.5. Could be worth investigating.
+
+
+def _cropPixels(pixels: np.ndarray, box: tuple[int, int, int, int]) -> np.ndarray:
+    '''
+    Crops an array of pixels to a bounding box, like `PIL.Image.Image.crop`. If the box is inside the array, this
+    is a view into it. Otherwise, a copy is made where pixels outside the array are 0.
+
+    :param pixels: The pixels to crop, as a (height, width) array
+    :param box: The bounding box to crop to, as (left, top, right + 1, bottom + 1)
+    :return: The cropped pixels
+    '''
+    left, top, right, bottom = box
+    height, width = pixels.shape[:2]
+    if left >= 0 and top >= 0 and right <= width and bottom <= height:
+        return pixels[top:bottom, left:right]
+    crop = np.zeros((bottom - top, right - left), dtype=pixels.dtype)
+    sourceLeft, sourceTop = max(left, 0), max(top, 0)
+    sourceRight, sourceBottom = min(right, width), min(bottom, height)
+    if sourceLeft < sourceRight and sourceTop < sourceBottom:
+        crop[sourceTop - top:sourceBottom - top, sourceLeft - left:sourceRight - left] = pixels[sourceTop:sourceBottom, sourceLeft:sourceRight]
+    return crop
@@ -130,14 +130,15 @@ def simpleTerrain(
     recolorBackground = recolor.Recolor(provinceMap, definition)
     waters: set[int] = set(defaultMap.seas + defaultMap.lakes)
     wastelands: set[int] = set(climate.wastelands)
+    landProvinces = [province for province in provinceMap.provinces if province not in waters and province not in wastelands]
+    terrains = terrainDefinition.getTerrains(landProvinces, defaultMap, terrainMap, provinceMap, treeMap, riverMap)
     for province in provinceMap.provinces:
         if province in waters:
             recolorBackground[province] = (185, 194, 255)
         elif province in wastelands:
             recolorBackground[province] = (94, 94, 94)
         else:
-            terrain = terrainDefinition.getTerrain(province, defaultMap, terrainMap, provinceMap, treeMap, riverMap)
-            recolorBackground[province] = terrain.color
+            recolorBackground[province] = terrains[province].color
     backgroundMap = recolorBackground.generate()
 
     print("Generating borders...")